@@ -1,44 +1,57 @@
 import json
-import boto3
-import time
+import orjson
 import os
+import time
 import logging
 from datetime import datetime, timedelta
 
 
 # ---------- Setup ----------
-ATHENA_DATABASE = os.environ["ATHENA_DATABASE"]
-ATHENA_OUTPUT = os.environ["ATHENA_OUTPUT"]
-ATHENA_TABLE = os.environ["ATHENA_TABLE"]
-ATHENA_WORKGROUP = os.environ["ATHENA_WORKGROUP"]
+BUCKET_NAME = os.environ["BUCKET_NAME"]
 
 CURRENCY_PAIRS = os.environ.get("CURRENCY_PAIRS", "USDJPY").split(",")  # convert string to a list
 METRIC_NAMESPACE = os.environ["METRIC_NAMESPACE"]
+FUNCTION_NAME = os.environ["AWS_LAMBDA_FUNCTION_NAME"]  # set by the Lambda runtime
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-athena = boto3.client("athena")
-cloudwatch = boto3.client("cloudwatch")
+_s3 = None  # created on first use, see get_s3_client
 
 
 # ---------- Helper Functions ----------
+def get_s3_client():
+    # boto3 is imported lazily so weekend invocations skip its import and client init
+    global _s3
+
+    if _s3 is None:
+        import boto3
+        from botocore.config import Config
+
+        boto_cfg = Config(
+            tcp_keepalive=True,
+            max_pool_connections=50,
+            retries={"max_attempts": 3, "mode": "adaptive"},
+            connect_timeout=2,
+            read_timeout=10
+        )
+        _s3 = boto3.client("s3", config=boto_cfg)
+
+    return _s3
+
+
 def get_run_date(event):
     raw_run_date = event["run_date"]
     dt = datetime.fromisoformat(raw_run_date.replace("Z", "+00:00"))
     fx_dt = dt - timedelta(days=1)
-    year = f"{fx_dt.year:04d}"
-    month = f"{fx_dt.month:02d}"
-    day = f"{fx_dt.day:02d}"
+    year, month, day = fx_dt.strftime("%Y-%m-%d").split("-")
 
     return year, month, day, fx_dt
 
 
 def get_yesterdays_date(fx_dt):
     dt_pd = fx_dt - timedelta(days=1)
-    year_pd = f"{dt_pd.year:04d}"
-    month_pd = f"{dt_pd.month:02d}"
-    day_pd = f"{dt_pd.day:02d}"
+    year_pd, month_pd, day_pd = dt_pd.strftime("%Y-%m-%d").split("-")
 
     return year_pd, month_pd, day_pd
 
@@ -48,110 +61,93 @@ def is_weekend(fx_dt):
     return fx_dt.weekday() >= 5  # 5 = Saturday, 6 = Sunday
 
 
-def start_query(query):
-    logger.info(f"Initiating query: Database={ATHENA_DATABASE}, Table={ATHENA_TABLE}, Workgroup={ATHENA_WORKGROUP}")
+def build_s3_key(year, month, day):
+    # Processed rates for all pairs are written to one object per day
 
-    response = athena.start_query_execution(
-        QueryString=query,
-        QueryExecutionContext={"Database": ATHENA_DATABASE},
-        ResultConfiguration={"OutputLocation": ATHENA_OUTPUT},
-        WorkGroup=ATHENA_WORKGROUP
-    )
+    return f"processed/year={year}/month={month}/day={day}/rates.jsonl"
 
-    return response["QueryExecutionId"]
 
+def build_legacy_s3_key(pair, year, month, day):
+    # Per-pair layout used before the daily rates.jsonl cutover
 
-def wait_for_query(query_execution_id):
-    while True:
-        response = athena.get_query_execution(
-            QueryExecutionId=query_execution_id
-        )
-        status = response["QueryExecution"]["Status"]["State"]
+    return f"processed/pair={pair}/year={year}/month={month}/day={day}/data.json"
 
-        if status in ("SUCCEEDED", "FAILED", "CANCELLED"):
-            if status != "SUCCEEDED":
-                reason = response["QueryExecution"]["Status"].get("StateChangeReason", "Unknown")
-                logger.error(f"Athena query failed: {reason}")
-            return status
-        
-        time.sleep(2)
-        
 
-def get_single_value(query_execution_id):
-    results = athena.get_query_results(
-        QueryExecutionId=query_execution_id
-    )
+def read_legacy_rates(year, month, day):
+    # Fallback for dates written before the cutover that have not been backfilled
+    s3 = get_s3_client()
+    rates = {}
 
-    rows = results["ResultSet"]["Rows"]  # Row 0 = header, Row 1 = value
-    logger.info(f"Query Result = {rows}")
+    for pair in CURRENCY_PAIRS:
+        read_key = build_legacy_s3_key(pair, year, month, day)
+        logger.info(f"Reading legacy rate from s3://{BUCKET_NAME}/{read_key}")
 
-    return float(rows[1]["Data"][0]["VarCharValue"])
+        try:
+            response = s3.get_object(Bucket=BUCKET_NAME, Key=read_key)
+        except s3.exceptions.NoSuchKey:
+            continue  # reported as a missing rate by get_rate
 
+        record = orjson.loads(response["Body"].read())
+        rates[pair] = float(record["rate"])
 
-def get_todays_rate(pair, year, month, day):
-    logger.info(f"Initiating Athena query for todays rate on {pair}")
+    return rates
 
-    query = f"""
-    SELECT rate
-    FROM {ATHENA_TABLE}
-    WHERE pair = '{pair}'
-        AND year = '{year}'
-        AND month = '{month}'
-        AND day = '{day}'
-    """
 
-    logger.info(f"Query = {query}")
-    qid = start_query(query)
-    status = wait_for_query(qid)
+def read_rates(year, month, day):
+    s3 = get_s3_client()
+    read_key = build_s3_key(year, month, day)
+    logger.info(f"Reading rates from s3://{BUCKET_NAME}/{read_key}")
 
-    if status != "SUCCEEDED":
-        raise Exception(f"Athena query for todays rate on {pair} failed")
-    
-    return get_single_value(qid)
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=read_key)
+    except s3.exceptions.NoSuchKey:
+        logger.info(f"{read_key} not found, falling back to legacy per-pair keys")
+        return read_legacy_rates(year, month, day)
 
+    # Parse records as they stream in rather than buffering and splitting the body
+    rates = {}
+    for line in response["Body"].iter_lines():
+        if line.strip():
+            record = orjson.loads(line)
+            rates[record["pair"]] = float(record["rate"])
 
-def get_yesterdays_rate(pair, year_pd, month_pd, day_pd):
-    logger.info(f"Initiating Athena query for yesterdays rate on {pair}")
+    return rates
 
-    query = f"""
-    SELECT rate
-    FROM {ATHENA_TABLE}
-    WHERE pair = '{pair}'
-        AND year = '{year_pd}'
-        AND month = '{month_pd}'
-        AND day = '{day_pd}'
-    """
 
-    logger.info(f"Query = {query}")
-    qid = start_query(query)
-    status = wait_for_query(qid)
+def get_rate(rates, pair, date_label):
+    if pair not in rates:
+        raise ValueError(f"Missing {date_label} rate for: {pair}")
 
-    if status != "SUCCEEDED":
-        raise Exception(f"Athena query for yesterdays rate on {pair} failed")
-    
-    return get_single_value(qid)
+    return rates[pair]
 
 
 def publish_metric(pair, deviation):
     deviation_name = f"{pair}-Deviation"
     logger.info(f"Publishing metric ({deviation}%) for {pair} to CloudWatch under: {deviation_name}")
 
-    cloudwatch.put_metric_data(
-        Namespace=METRIC_NAMESPACE,
-        MetricData=[
-            {
-                "MetricName": deviation_name,
-                "Value": deviation,
-                "Unit": "Percent"
-            }
-        ]
-    )
+    # Embedded Metric Format: CloudWatch extracts the metric from this log line,
+    # so no PutMetricData call is made on the handler path
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRIC_NAMESPACE,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [{"Name": deviation_name, "Unit": "Percent"}]
+                }
+            ]
+        },
+        "FunctionName": FUNCTION_NAME,
+        deviation_name: deviation
+    }))
 
 
 # ---------- Lambda Handler ----------
 def lambda_handler(event, context):
 
-    logger.info("Received event: %s", json.dumps(event, indent=2, default=str))
+    logger.info("Received event: run_date=%s", event.get("run_date"))
+    logger.debug("Full event: %s", event)
 
     year, month, day, fx_dt = get_run_date(event)
     year_pd, month_pd, day_pd = get_yesterdays_date(fx_dt)
@@ -163,12 +159,15 @@ def lambda_handler(event, context):
 
     published_metrics = []
 
+    todays_rates = read_rates(year, month, day)
+    yesterdays_rates = read_rates(year_pd, month_pd, day_pd)
+
     for pair in CURRENCY_PAIRS:
-        todays_rate = get_todays_rate(pair, year, month, day)
-        yesterdays_rate = get_yesterdays_rate(pair, year_pd, month_pd, day_pd)
+        todays_rate = get_rate(todays_rates, pair, "todays")
+        yesterdays_rate = get_rate(yesterdays_rates, pair, "yesterdays")
         deviation = (abs(todays_rate - yesterdays_rate) / yesterdays_rate) * 100  # Convert to percentage
 
-        logger.info(f"{pair}: Todays rate = {todays_rate}, Yesterdays rate = {yesterdays_rate}, Deviation = {deviation}%")
+        logger.info("%s: Todays rate = %s, Yesterdays rate = %s, Deviation = %s%%", pair, todays_rate, yesterdays_rate, deviation)
         publish_metric(pair, deviation)
         published_metrics.append({pair: deviation})
 
@@ -1,39 +1,80 @@
 import json
 import os
+import time
 import logging
 from datetime import datetime, timedelta
-import urllib.request
-import urllib.parse
 import boto3
+import urllib3
+import orjson
+from botocore.config import Config
 
 
 # ---------- Setup ----------
 BUCKET_NAME = os.environ["BUCKET_NAME"]
 CURRENCY_PAIRS = os.environ.get("CURRENCY_PAIRS", "USDJPY").split(",")  # convert string to a list
+CURRENCY_PAIR_SET = frozenset(CURRENCY_PAIRS)
+REQUIRED_FIELDS = frozenset({"timestamp", "quotes"})
 FX_API_URL = os.environ["FX_API_URL"]
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ssm = boto3.client("ssm")
-s3 = boto3.client("s3")
+_BOTO_CFG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    connect_timeout=2,
+    read_timeout=10
+)
+
+# Explicit session for both clients; boto3.client() already shares one default
+# session, so this only makes that sharing visible rather than saving any work
+_SESSION = boto3.session.Session()
+ssm = _SESSION.client("ssm", config=_BOTO_CFG)
+s3 = _SESSION.client("s3", config=_BOTO_CFG)
+
+# Pooled HTTPS connection to the FX API, reused across warm invocations
+_HTTP = urllib3.PoolManager(num_pools=1, maxsize=4, timeout=5.0)
+
+API_KEY_PARAMETER = "/fx/api/access_key"
+PARAMETER_NAMES = [API_KEY_PARAMETER]  # fetched together in a single GetParameters call
+
+PARAMETER_TTL_SECONDS = 900  # re-fetch after 15 minutes so key rotation is picked up
+_PARAMETER_CACHE = {"values": None, "fetched_at": 0}
 
 
 # ---------- Helper Functions ----------
-def get_api_key():
-    logger.info("Retrieving API Key from Parameter Store")
-    response = ssm.get_parameter(Name="/fx/api/access_key", WithDecryption=True)
+def get_parameters(names):
+    logger.info(f"Retrieving parameters from Parameter Store: {names}")
+    response = ssm.get_parameters(Names=names, WithDecryption=True)
+
+    if response["InvalidParameters"]:
+        raise ValueError(f"Missing parameters in Parameter Store: {response['InvalidParameters']}")
+
+    return {parameter["Name"]: parameter["Value"] for parameter in response["Parameters"]}
+
+
+def _get_parameters_cached(ttl=PARAMETER_TTL_SECONDS):
+    # Reuse parameters across warm invocations of the same container
+    if _PARAMETER_CACHE["values"] is not None and time.time() - _PARAMETER_CACHE["fetched_at"] < ttl:
+        return _PARAMETER_CACHE["values"]
+
+    _PARAMETER_CACHE["values"] = get_parameters(PARAMETER_NAMES)
+    _PARAMETER_CACHE["fetched_at"] = time.time()
 
-    return response["Parameter"]["Value"]
+    return _PARAMETER_CACHE["values"]
+
+
+def _get_api_key_cached():
+
+    return _get_parameters_cached()[API_KEY_PARAMETER]
 
 
 def get_run_date(event):
     raw_run_date = event["run_date"]
     dt = datetime.fromisoformat(raw_run_date.replace("Z", "+00:00"))
     fx_dt = dt - timedelta(days=1)
-    year = f"{fx_dt.year:04d}"
-    month = f"{fx_dt.month:02d}"
-    day = f"{fx_dt.day:02d}"
+    year, month, day = fx_dt.strftime("%Y-%m-%d").split("-")
 
     return year, month, day
 
@@ -64,13 +105,12 @@ def fetch_fx_rates(api_key, quote_currencies):
         "currencies": ",".join(quote_currencies)  # convert list into single string
     }
 
-    url = FX_API_URL + "?" + urllib.parse.urlencode(params)
-    logger.info(f"Requesting FX data from {url}")
+    logger.info(f"Requesting FX data from {FX_API_URL}")
 
-    with urllib.request.urlopen(url, timeout=5) as response:
-        if response.status != 200:
-            raise RuntimeError(f"FX API returned status {response.status}")
-        data = json.loads(response.read())
+    response = _HTTP.request("GET", FX_API_URL, fields=params)
+    if response.status != 200:
+        raise RuntimeError(f"FX API returned status {response.status}")
+    data = orjson.loads(response.data)
     
     logger.info(data)
 
@@ -110,16 +150,15 @@ def calculate_pairs(data, pairs):
 
 def validate_fx_data(data, pairs):
     # Basic validation to catch bad or partial responses
-    required_fields = ["timestamp", "quotes"]
-    logger.info(f"Validating required fields are in data: {required_fields}")
+    logger.info(f"Validating required fields are in data: {sorted(REQUIRED_FIELDS)}")
 
-    for field in required_fields:
-        if field not in data:
-            raise ValueError(f"Missing required field: {field}")
-    
-    for pair in pairs:
-        if pair not in data["quotes"]:
-            raise ValueError(f"Missing FX quote for: {pair}")
+    missing_fields = REQUIRED_FIELDS - data.keys()
+    if missing_fields:
+        raise ValueError(f"Missing required field: {', '.join(sorted(missing_fields))}")
+
+    missing_pairs = pairs - data["quotes"].keys()
+    if missing_pairs:
+        raise ValueError(f"Missing FX quote for: {', '.join(sorted(missing_pairs))}")
 
 
 def build_s3_key(year, month, day):
@@ -134,24 +173,32 @@ def write_to_s3(s3_key, data):
     s3.put_object(
         Bucket=BUCKET_NAME,
         Key=s3_key,
-        Body=json.dumps(data),
+        Body=orjson.dumps(data),
         ContentType="application/json"
     )
 
 
+# Warm the parameter cache during init; failures are retried on first invocation
+try:
+    _get_parameters_cached()
+except Exception:
+    logger.exception("Failed to prefetch parameters during init")
+
+
 # ---------- Lambda Handler ----------
 def lambda_handler(event, context):
     logger.info("FX ingestion lambda started")
-    logger.info("Received event: %s", json.dumps(event, indent=2, default=str))
+    logger.info("Received event: run_date=%s", event.get("run_date"))
+    logger.debug("Full event: %s", event)
 
     try:
-        api_key = get_api_key()
+        api_key = _get_api_key_cached()
         quote_currencies = list_quote_currencies(CURRENCY_PAIRS)
 
         raw_fx_data = fetch_fx_rates(api_key, quote_currencies)
         pairs_fx_data = calculate_pairs(raw_fx_data, CURRENCY_PAIRS)
 
-        validate_fx_data(pairs_fx_data, CURRENCY_PAIRS)
+        validate_fx_data(pairs_fx_data, CURRENCY_PAIR_SET)
 
         year, month, day = get_run_date(event)
         s3_key = build_s3_key(year, month, day)
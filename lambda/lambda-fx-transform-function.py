@@ -1,6 +1,7 @@
-import json
 import os
 import boto3
+import orjson
+from botocore.config import Config
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
@@ -9,11 +10,21 @@ from decimal import Decimal, ROUND_HALF_UP
 # ---------- Setup ----------
 bucket = os.environ["BUCKET_NAME"]
 CURRENCY_PAIRS = os.environ.get("CURRENCY_PAIRS", "USDJPY").split(",")  # convert string to a list
+CURRENCY_PAIR_SET = frozenset(CURRENCY_PAIRS)
+REQUIRED_FIELDS = frozenset({"timestamp", "quotes"})
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client("s3")
+_BOTO_CFG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    connect_timeout=2,
+    read_timeout=10
+)
+
+s3 = boto3.client("s3", config=_BOTO_CFG)
 
 
 # ---------- Helper Functions ----------
@@ -21,9 +32,7 @@ def get_run_date(event):
     raw_run_date = event["run_date"]
     dt = datetime.fromisoformat(raw_run_date.replace("Z", "+00:00"))
     fx_dt = dt - timedelta(days=1)
-    year = f"{fx_dt.year:04d}"
-    month = f"{fx_dt.month:02d}"
-    day = f"{fx_dt.day:02d}"
+    year, month, day = fx_dt.strftime("%Y-%m-%d").split("-")
 
     return year, month, day, fx_dt
 
@@ -39,22 +48,21 @@ def read_raw_object(read_key):
     logger.info("Reading S3 object from bucket")
 
     response = s3.get_object(Bucket=bucket, Key=read_key)
-    data = json.loads(response["Body"].read())
+    data = orjson.loads(response["Body"].read())
     return data
 
 
 def validate_fx_data(data, pairs):
     # Basic validation to catch bad or partial responses
-    required_fields = ["timestamp", "quotes"]
-    logger.info(f"Validating required fields are in data: {required_fields}")
+    logger.info(f"Validating required fields are in data: {sorted(REQUIRED_FIELDS)}")
 
-    for field in required_fields:
-        if field not in data:
-            raise ValueError(f"Missing required field: {field}")
-    
-    for pair in pairs:
-        if pair not in data["quotes"]:
-            raise ValueError(f"Missing FX quote for: {pair}")
+    missing_fields = REQUIRED_FIELDS - data.keys()
+    if missing_fields:
+        raise ValueError(f"Missing required field: {', '.join(sorted(missing_fields))}")
+
+    missing_pairs = pairs - data["quotes"].keys()
+    if missing_pairs:
+        raise ValueError(f"Missing FX quote for: {', '.join(sorted(missing_pairs))}")
 
 
 def is_weekday(fx_dt):
@@ -76,8 +84,13 @@ def format_fx_rate(rate, decimals):
         
 
 def normalize_and_write(data, year, month, day, fx_dt):
+    # All pairs for the day go into a single JSON Lines object, one PUT per run
     quotes = data["quotes"]
-    written_files = []
+    lines = []
+
+    # Fields shared by every record for the day
+    date_str = f"{year}-{month}-{day}"
+    market_open = is_weekday(fx_dt)
 
     for pair, rate in quotes.items():
 
@@ -85,33 +98,33 @@ def normalize_and_write(data, year, month, day, fx_dt):
         formatted_rate = format_fx_rate(rate, decimals)
 
         record = {
+            "pair": pair,
             "rate": formatted_rate,
-            "date": f"{year}-{month}-{day}",
-            "market_open": is_weekday(fx_dt)
+            "date": date_str,
+            "market_open": market_open
         }
 
-        write_key = (
-            f"processed/pair={pair}/year={year}/month={month}/day={day}/data.json"
-        )
+        lines.append(orjson.dumps(record))
 
-        logger.info(f"Writing file to bucket: {write_key}")
+    write_key = f"processed/year={year}/month={month}/day={day}/rates.jsonl"
 
-        s3.put_object(
-            Bucket=bucket,
-            Key=write_key,
-            Body=json.dumps(record),
-            ContentType="application/json"
-        )
-    
-        written_files.append(write_key)
+    logger.info(f"Writing file to bucket: {write_key}")
+
+    s3.put_object(
+        Bucket=bucket,
+        Key=write_key,
+        Body=b"\n".join(lines),
+        ContentType="application/x-ndjson"
+    )
 
-    return written_files
+    return [write_key]
 
 
 # ---------- Lambda Handler ----------
 def lambda_handler(event, context):
 
-    logger.info("Received event: %s", json.dumps(event, indent=2, default=str))
+    logger.info("Received event: run_date=%s", event.get("run_date"))
+    logger.debug("Full event: %s", event)
 
     year, month, day, fx_dt = get_run_date(event)
     read_key = build_s3_key(year, month, day)
@@ -122,7 +135,7 @@ def lambda_handler(event, context):
         return
     
     data = read_raw_object(read_key)
-    validate_fx_data(data, CURRENCY_PAIRS)
+    validate_fx_data(data, CURRENCY_PAIR_SET)
 
     output_keys = normalize_and_write(data, year, month, day, fx_dt)
 
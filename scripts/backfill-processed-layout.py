@@ -0,0 +1,103 @@
+import argparse
+import json
+import logging
+import re
+from collections import defaultdict
+
+import boto3
+from botocore.exceptions import ClientError
+
+
+# One-off backfill: rewrites legacy per-pair processed objects
+#   processed/pair=<PAIR>/year=<Y>/month=<M>/day=<D>/data.json
+# into the daily JSON Lines layout read by the analysis Lambda and Athena
+#   processed/year=<Y>/month=<M>/day=<D>/rates.jsonl
+
+# ---------- Setup ----------
+LEGACY_KEY_PATTERN = re.compile(
+    r"^processed/pair=(?P<pair>[A-Z]{6})/year=(?P<year>\d{4})/month=(?P<month>\d{2})/day=(?P<day>\d{2})/data\.json$"
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+s3 = boto3.client("s3")
+
+
+# ---------- Helper Functions ----------
+def list_legacy_keys(bucket):
+    # Groups legacy object keys by (year, month, day)
+    keys_by_date = defaultdict(list)
+    paginator = s3.get_paginator("list_objects_v2")
+
+    for page in paginator.paginate(Bucket=bucket, Prefix="processed/pair="):
+        for obj in page.get("Contents", []):
+            match = LEGACY_KEY_PATTERN.match(obj["Key"])
+            if match:
+                date_parts = (match["year"], match["month"], match["day"])
+                keys_by_date[date_parts].append((match["pair"], obj["Key"]))
+
+    return keys_by_date
+
+
+def build_s3_key(year, month, day):
+
+    return f"processed/year={year}/month={month}/day={day}/rates.jsonl"
+
+
+def object_exists(bucket, key):
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "404":
+            return False
+        raise
+
+    return True
+
+
+def build_daily_body(bucket, legacy_keys):
+    lines = []
+
+    for pair, legacy_key in sorted(legacy_keys):
+        response = s3.get_object(Bucket=bucket, Key=legacy_key)
+        record = json.loads(response["Body"].read())
+        record = {"pair": pair, **record}
+        lines.append(json.dumps(record))
+
+    return "\n".join(lines)
+
+
+def backfill(bucket, dry_run):
+    keys_by_date = list_legacy_keys(bucket)
+    logger.info(f"Found legacy objects for {len(keys_by_date)} dates")
+
+    for (year, month, day), legacy_keys in sorted(keys_by_date.items()):
+        write_key = build_s3_key(year, month, day)
+
+        # Never overwrite a day already written by the new transform Lambda
+        if object_exists(bucket, write_key):
+            logger.info(f"Skipping {write_key}: already exists")
+            continue
+
+        if dry_run:
+            logger.info(f"Would write {write_key} from {len(legacy_keys)} legacy objects")
+            continue
+
+        s3.put_object(
+            Bucket=bucket,
+            Key=write_key,
+            Body=build_daily_body(bucket, legacy_keys),
+            ContentType="application/x-ndjson"
+        )
+        logger.info(f"Wrote {write_key} from {len(legacy_keys)} legacy objects")
+
+
+# ---------- Entry Point ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill legacy per-pair processed FX data into daily rates.jsonl files")
+    parser.add_argument("--bucket", required=True, help="FX data bucket name")
+    parser.add_argument("--dry-run", action="store_true", help="List the files that would be written without writing them")
+    args = parser.parse_args()
+
+    backfill(args.bucket, args.dry_run)